@@ -25,6 +25,10 @@ Usage Examples:
 """
 
 import argparse
+import atexit
+import errno
+import fcntl
+import io
 import subprocess
 import os
 import sys
@@ -32,27 +36,83 @@ import time
 import tempfile
 import threading
 import signal
+import socket
+import struct
 import json
+import selectors
 import uuid
-from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional, Tuple, Any
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union, Any
 import re
+import shlex
+import shutil
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    # orjson is optional; fall back to the stdlib parser
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode('utf-8')
+
+    _loads = json.loads
+
+
+# REPL detection: command is python (any version), bash, sh, zsh
+_REPL_RE = re.compile(r'^\s*(?:python[\d.]*|bash|sh|zsh)(?:\s|$)')
+# Shells (pane_current_command), whose readiness is signalled by an echoed marker line
+_SHELL_RE = re.compile(r'^\s*(?:bash|sh|dash|zsh)(?:\s|$)')
+# Python's primary prompt (possibly after output without a trailing newline) or a bare continuation prompt
+_PY_PROMPT_RE = re.compile(r'(?:>>>|^\.\.\.)$')
+# Marker lines echoed after shell sends, and the marker commands typed for them
+_MARKER_RE = re.compile(r'^__END_[0-9a-f]{12}__$')
+_MARKER_CMD_RE = re.compile(r'(?:\}; )?echo "__END_""[0-9a-f]{12}__"')
+
+SOCKET_PATH = os.path.expanduser("~/.cli_commander.sock")
+# How long a client waits for the daemon's reply
+CLIENT_TIMEOUT = 60.0
+
+
+def _code_version() -> str:
+    """Identify this copy of the module so clients can replace a daemon running older code."""
+    st = os.stat(os.path.abspath(__file__))
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+CODE_VERSION = _code_version()
+
+
+def _tmux_quote(arg: str) -> str:
+    """Quote one argument for tmux's command parser.
+
+    Control mode reads one command per line, so arguments containing newlines
+    use a double-quoted string with tmux's \\n escape instead.
+    """
+    if "\n" not in arg:
+        return shlex.quote(arg)
+    escaped = arg.replace("\\", "\\\\").replace('"', '\\"').replace("$", "\\$").replace("\n", "\\n")
+    return f'"{escaped}"'
 
 
 class UnifiedProcessManager:
     """Unified process manager for Linux only (tmux-based REPL)."""
 
     @staticmethod
-    def start_detached_process(command: str) -> subprocess.Popen:
-        """Start detached process (Linux only)."""
+    def start_detached_process(command: Union[str, Sequence[str]]) -> subprocess.Popen:
+        """Start detached process (Linux only). Prefer an argv list; a string is split with shlex."""
+        argv = shlex.split(command) if isinstance(command, str) else list(command)
+        # An explicit executable path skips the PATH search in the child
+        argv[0] = shutil.which(argv[0]) or argv[0]
         return subprocess.Popen(
-            command,
-            shell=True,
+            argv,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             stdin=subprocess.DEVNULL,
-            preexec_fn=os.setsid
+            start_new_session=True
         )
 
     @staticmethod
@@ -83,6 +143,11 @@ class UnifiedProcessManager:
         except:
             return False
 
+    @staticmethod
+    def running_pids() -> Set[int]:
+        """Snapshot all running PIDs with a single /proc listing (Linux only)."""
+        return {int(entry) for entry in os.listdir('/proc') if entry.isdigit()}
+
 
 
 
@@ -90,35 +155,405 @@ class UnifiedProcessManager:
 class CLI_Commander:
     """Linux only: tmux-based REPL process manager"""
 
-    def __init__(self):
-        self.process_file = "unified_process_info.json"
+    CONTROL_SESSION = "_cli_commander"
+    # Resolved once so Popen gets an explicit executable path
+    TMUX = shutil.which("tmux") or "tmux"
+    # Coalesce window for writes of the process file
+    SAVE_DELAY = 0.25
+    # Upper bound on how long a send waits for its command to finish
+    READY_TIMEOUT = 5.0
+    # How long a timed-out command may take to open its output FIFO before the drain gives up
+    DRAIN_TIMEOUT = 60.0
+    # Non-shell REPLs showing no known prompt count as ready after this long without changes
+    QUIET_PERIOD = 2.0
+    # Idle tmux sessions kept for reuse by new processes
+    POOL_SIZE = 4
+    POOL_PREFIX = "cli_pool_"
+    # Cached log timestamp (see _timestamp)
+    _ts_cached_sec = 0
+    _ts_cached_str = ''
+
+    def __init__(self, process_file: str = "unified_process_info.json"):
+        self.process_file = process_file
         self.processes = {}
+        # Stream log lines are written to (swapped per request by the daemon)
+        self.out = sys.stdout
         self.process_manager = UnifiedProcessManager()
+        self._tmux_proc: Optional[subprocess.Popen] = None
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        self._save_lock = threading.Lock()
+        self._fifo: Optional[str] = None
+        # FIFOs of timed-out commands still being drained in the background
+        self._draining_fifos: Set[str] = set()
+        # (st_mtime_ns, st_size) of the process file as last loaded or saved
+        self._file_stamp: Optional[Tuple[int, int]] = None
         self.load_processes()
+        atexit.register(self.flush_processes)
+        atexit.register(self._remove_fifo)
+
+    def __del__(self):
+        self.close_tmux_control()
+
+    def _start_tmux_control(self):
+        """Start a persistent tmux control-mode client (tmux -C) used for all tmux commands."""
+        # $TMUX is kept so sessions land on the same server plain tmux commands would use
+        self._tmux_proc = subprocess.Popen(
+            [self.TMUX, "-C", "new-session", "-A", "-s", self.CONTROL_SESSION],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+        # Consume the reply block of the initial new-session command
+        self._read_tmux_block()
+        # Let tmux remove the control session once the last control client is gone
+        self._tmux_cmd(["set-option", "-t", self.CONTROL_SESSION, "destroy-unattached", "on"])
+
+    def _read_tmux_block(self) -> Tuple[str, bool]:
+        """Read one %begin/%end (or %error) guarded reply from the control client.
+
+        Returns (output, ok) where ok is False for an %error block.
+        """
+        stdout = self._tmux_proc.stdout
+        guard = None
+        lines = []
+        while True:
+            line = stdout.readline()
+            if not line:
+                raise RuntimeError("tmux control connection closed")
+            line = line.rstrip("\n")
+            if guard is None:
+                # Skip asynchronous notifications (%output, %sessions-changed, ...)
+                if line.startswith("%begin "):
+                    guard = line.split()[1:3]
+                continue
+            if line.startswith(("%end ", "%error ")) and line.split()[1:3] == guard:
+                return "\n".join(lines), line.startswith("%end ")
+            lines.append(line)
+
+    def _tmux_batch(self, commands: List[List[str]]) -> List[str]:
+        """Run several tmux commands (argv lists) in one write over the control connection.
+
+        Arguments are quoted for tmux's command parser, so payloads are passed
+        through literally. tmux executes the commands in order and answers with one
+        guarded block each. All replies are read before the first failure is raised,
+        keeping the stream in sync.
+        """
+        if self._tmux_proc is None or self._tmux_proc.poll() is not None:
+            self._start_tmux_control()
+        self._tmux_proc.stdin.write("".join(" ".join(map(_tmux_quote, argv)) + "\n" for argv in commands))
+        self._tmux_proc.stdin.flush()
+        replies = [self._read_tmux_block() for _ in commands]
+        for output, ok in replies:
+            if not ok:
+                raise RuntimeError(output or "tmux command failed")
+        return [output for output, _ in replies]
+
+    def _tmux_cmd(self, argv: List[str]) -> str:
+        """Run one tmux command (argv list) over the control-mode connection and return its output."""
+        return self._tmux_batch([argv])[0]
+
+    def close_tmux_control(self):
+        """Close the control-mode connection (tmux drops the control session on detach)."""
+        proc = self._tmux_proc
+        if proc is None:
+            return
+        self._tmux_proc = None
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=1)
+        except Exception:
+            proc.kill()
+
+    def _timestamp(self) -> str:
+        """Local time formatted to the second; strftime only runs when the second changes."""
+        now = int(time.time())
+        if now != self._ts_cached_sec:
+            self._ts_cached_sec = now
+            self._ts_cached_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+        return self._ts_cached_str
 
     def log(self, message: str, process_name: str = "CLI_Commander", log_type: str = "INFO"):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] [{process_name}] [{log_type}] {message}")
+        self.out.write(f"[{self._timestamp()}] [{process_name}] [{log_type}] {message}\n")
 
     def save_processes(self):
+        with self._save_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._dirty = False
+            tmp_file = f"{self.process_file}.tmp"
+            try:
+                Path(tmp_file).write_bytes(_dumps(self.processes))
+                os.replace(tmp_file, self.process_file)
+                self._file_stamp = self._stat_process_file()
+            except Exception as e:
+                self.log(f"Failed to save processes: {e}", log_type="ERROR")
+
+    def flush_processes(self):
+        """Write the process file if there are unsaved changes."""
+        if self._dirty:
+            self.save_processes()
+
+    def _mark_dirty(self):
+        """Schedule a coalesced save instead of rewriting the file on every change."""
+        with self._save_lock:
+            self._dirty = True
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+            self._flush_timer = threading.Timer(self.SAVE_DELAY, self.flush_processes)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _stat_process_file(self) -> Optional[Tuple[int, int]]:
         try:
-            with open(self.process_file, 'w', encoding='utf-8') as f:
-                json.dump(self.processes, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            self.log(f"Failed to save processes: {e}", log_type="ERROR")
+            st = os.stat(self.process_file)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def reload_if_changed(self) -> bool:
+        """Reload the process file if it changed since it was last loaded or saved by this commander."""
+        if self._stat_process_file() == self._file_stamp:
+            return False
+        self.load_processes()
+        return True
 
     def load_processes(self):
-        if not os.path.exists(self.process_file):
+        self._file_stamp = self._stat_process_file()
+        if self._file_stamp is None:
+            self.processes = {}
             return
         try:
-            with open(self.process_file, 'r', encoding='utf-8') as f:
-                self.processes = json.load(f)
+            data = _loads(Path(self.process_file).read_bytes())
+            # Files written by older versions carry the full pane text per REPL; only repl_line is used now
+            legacy = False
+            for info in data.values():
+                if isinstance(info, dict) and info.pop('last_repl_output', None) is not None:
+                    legacy = True
+            self.processes = data
+            if legacy:
+                self._mark_dirty()
         except Exception as e:
             self.log(f"Failed to load processes: {e}", log_type="WARNING")
             self.processes = {}
 
-    def send_to_process(self, name: str, command: str) -> bool:
-        """Send command to tmux session. For REPL (python, bash), use send-keys directly. For others, use output redirection."""
+    @staticmethod
+    def _position_cmd(session: str) -> List[str]:
+        return ["display-message", "-p", "-t", session, "#{history_size} #{cursor_y} #{cursor_x} #{history_limit}"]
+
+    @staticmethod
+    def _parse_position(result: str) -> Tuple[int, int, int, int]:
+        """Parse _position_cmd output into (history_size, absolute cursor line, cursor column, history_limit)."""
+        history_size, cursor_y, cursor_x, history_limit = (int(v) for v in result.split())
+        return history_size, history_size + cursor_y, cursor_x, history_limit
+
+    @staticmethod
+    def _history_full(position: Tuple[int, int, int, int]) -> bool:
+        """True once tmux may have trimmed the pane history, which shifts absolute line numbers.
+
+        tmux drops a tenth of history_limit whenever the history reaches it, so the
+        history size never falls below that band again until the history is cleared.
+        """
+        history_size, _, _, history_limit = position
+        return history_size >= history_limit - max(history_limit // 10, 1)
+
+    @classmethod
+    def _capture_cmd(cls, session: str, start_line: int, position: Tuple[int, int, int, int]) -> List[str]:
+        """capture-pane for the lines from absolute start_line to the cursor at position."""
+        history_size, end_line, _, _ = position
+        if start_line > end_line or cls._history_full(position):
+            # Pane was cleared or history trimmed, so start_line is no longer valid; fall back to the visible screen
+            start_line = history_size
+        return ["capture-pane", "-p", "-t", session, "-S", str(start_line - history_size), "-E", str(end_line - history_size)]
+
+    @staticmethod
+    def _send_keys_cmds(session: str, text: str) -> List[List[str]]:
+        """send-keys commands typing text literally (-l, so words like 'Enter' are not key names), one Enter per line."""
+        commands = []
+        for line in text.split("\n"):
+            if line:
+                commands.append(["send-keys", "-t", session, "-l", "--", line])
+            commands.append(["send-keys", "-t", session, "Enter"])
+        return commands
+
+    def _wait_for_prompt(self, session: str, start_line: int,
+                         marker: Optional[str] = None) -> Tuple[Tuple[int, int, int, int], str]:
+        """Poll the pane until the REPL is ready for the next command.
+
+        Shell REPLs pass the marker line echoed after the command: ready means the
+        marker and the prompt after it are on screen. Otherwise the cursor must have
+        left start_line and settled after a Python prompt, or stayed unchanged for
+        QUIET_PERIOD after other text (e.g. an input() prompt).
+        Each poll is a single batch: the pane position plus a capture of the new
+        lines as of the previous poll. Once two polls agree that capture is current,
+        so the last turn needs no extra round-trip.
+        Returns (final _parse_position tuple, captured output).
+        """
+        deadline = time.monotonic() + self.READY_TIMEOUT
+        delay = 0.002
+        previous = None
+        previous_output = None
+        quiet_since = time.monotonic()
+        while True:
+            commands = [self._position_cmd(session)]
+            if previous is not None:
+                commands.append(self._capture_cmd(session, start_line, previous))
+            replies = self._tmux_batch(commands)
+            position = self._parse_position(replies[0])
+            now = time.monotonic()
+            if position == previous:
+                output = replies[1]
+                if output != previous_output:
+                    quiet_since = now
+                if self._is_ready(output, position, start_line, marker, now - quiet_since) or now >= deadline:
+                    return position, output
+                previous_output = output
+            else:
+                quiet_since = now
+                if now >= deadline:
+                    return position, self._tmux_cmd(self._capture_cmd(session, start_line, position))
+            previous = position
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def _is_ready(self, output: str, position: Tuple[int, int, int, int], start_line: int,
+                  marker: Optional[str], quiet: float) -> bool:
+        """Readiness test of _wait_for_prompt for a current capture that has been unchanged for quiet seconds."""
+        _, line, cursor_x, _ = position
+        if line == start_line or cursor_x == 0:
+            return False
+        if marker is not None:
+            # The marker, then the prompt on the cursor line
+            return self._has_marker(output.rsplit("\n", 1)[0], marker)
+        lines = output.split("\n")
+        return bool(_PY_PROMPT_RE.search(lines[-1].rstrip())) or quiet >= self.QUIET_PERIOD
+
+    @staticmethod
+    def _has_marker(output: str, marker: str) -> bool:
+        return any(line.rstrip() == marker for line in output.split("\n"))
+
+    @staticmethod
+    def _strip_marker(output: str, marker: Optional[str]) -> str:
+        """Cut output at the marker line and remove marker lines and typed marker commands (plus their prompt).
+
+        Markers of earlier sends (e.g. one that outlived READY_TIMEOUT) are removed as well.
+        """
+        lines = output.split("\n")
+        prompt = ""
+        for index in range(len(lines) - 1, -1, -1):
+            if marker is not None and lines[index].rstrip() == marker:
+                if index + 1 < len(lines):
+                    prompt = lines[index + 1].rstrip()
+                lines = lines[:index]
+                break
+        kept = []
+        for line in lines:
+            if _MARKER_RE.match(line.rstrip()):
+                continue
+            if _MARKER_CMD_RE.search(line):
+                # Typed at the continuation prompt, or echoed by the tty while an earlier command ran;
+                # keep any output sharing the line
+                line = _MARKER_CMD_RE.sub("", line).rstrip()
+                if prompt and line.endswith(prompt):
+                    line = line[:-len(prompt)].rstrip()
+                # ">" is what is left of bash's default continuation prompt (PS2)
+                if not line or line == ">":
+                    continue
+            kept.append(line)
+        return "\n".join(kept)
+
+    def _output_fifo(self) -> str:
+        """Return the FIFO that non-REPL command output is redirected to, creating it on first use."""
+        if self._fifo is None:
+            fifo_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            fifo = os.path.join(fifo_dir, f"cli_commander_{os.getpid()}_{uuid.uuid4().hex[:8]}.fifo")
+            os.mkfifo(fifo, 0o600)
+            self._fifo = fifo
+        return self._fifo
+
+    def _remove_fifo(self):
+        for fifo in [self._fifo, *self._draining_fifos]:
+            if fifo is None:
+                continue
+            try:
+                os.unlink(fifo)
+            except OSError:
+                pass
+        self._fifo = None
+        self._draining_fifos.clear()
+
+    def _read_until_eof(self, fd: int) -> Tuple[str, bool]:
+        """Wait on the FIFO read end (epoll via selectors) until the writer exits or READY_TIMEOUT passes.
+
+        Returns (output, eof); eof is False when the command was still running at the timeout.
+        """
+        chunks = []
+        eof = False
+        deadline = time.monotonic() + self.READY_TIMEOUT
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not selector.select(remaining):
+                    break
+                data = os.read(fd, 65536)
+                if not data:
+                    eof = True
+                    break
+                chunks.append(data)
+        return b"".join(chunks).decode('utf-8', errors='replace'), eof
+
+    def _drain_fifo(self, fd: int, fifo: str):
+        """Keep reading a timed-out command's FIFO in a background thread, then close and remove it at EOF.
+
+        The command keeps a reader, so its writes never fail with SIGPIPE. If no writer
+        opens the FIFO within DRAIN_TIMEOUT (the pane is not a shell running the
+        redirect), the drain gives up.
+        """
+        self._draining_fifos.add(fifo)
+
+        def drain():
+            deadline = time.monotonic() + self.DRAIN_TIMEOUT
+            connected = False
+            try:
+                with selectors.DefaultSelector() as selector:
+                    selector.register(fd, selectors.EVENT_READ)
+                    while True:
+                        # Linux raises no POLLHUP on a FIFO that never had a writer, so poll until one shows up
+                        ready = selector.select(None if connected else 1.0)
+                        try:
+                            data = os.read(fd, 65536)
+                        except BlockingIOError:
+                            # A writer holds the FIFO but has nothing to say yet; its close will wake us
+                            connected = True
+                            continue
+                        if data:
+                            connected = True
+                        elif ready or connected:
+                            # EOF after the writer closed
+                            break
+                        elif time.monotonic() >= deadline:
+                            break
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+                self._draining_fifos.discard(fifo)
+                try:
+                    os.unlink(fifo)
+                except OSError:
+                    pass
+
+        threading.Thread(target=drain, name="cli_commander-drain", daemon=True).start()
+
+    def send_to_process(self, name: str, command: str, expect_output: bool = True) -> bool:
+        """Send command to tmux session. For REPL (python, bash), use send-keys directly. For others, use output redirection.
+
+        With expect_output=False the keys are sent without waiting for, capturing or logging the output.
+        """
         if name not in self.processes:
             self.log(f"Process '{name}' not found", log_type="ERROR")
             return False
@@ -127,75 +562,195 @@ class CLI_Commander:
             self.log(f"Process '{name}' is not a tmux session", log_type="ERROR")
             return False
         session = info['tmux_session']
-        # REPL detection: command is python, python3, bash, sh, zsh, etc.
-        repl_keywords = ["python", "python3", "bash", "sh", "zsh"]
-        is_repl = False
-        proc_cmd = info.get('command', '') or ''
-        for kw in repl_keywords:
-            if proc_cmd.strip().startswith(kw):
-                is_repl = True
-                break
+        is_repl = bool(_REPL_RE.match(info.get('command') or ''))
         try:
+            if not expect_output:
+                self._tmux_batch(self._send_keys_cmds(session, command))
+                # The pane moved on without us tracking it; the next send re-reads its position
+                if info.pop('repl_line', None) is not None:
+                    self._mark_dirty()
+                return True
             if is_repl:
-                # Send command
-                send_cmd = f"tmux send-keys -t {session} '{command}' Enter"
-                subprocess.run(send_cmd, shell=True, check=True)
-                time.sleep(0.2)
-
-                # Get output after sending command (capture all)
-                capture_cmd = f"tmux capture-pane -pt {session}"
-                result = subprocess.run(capture_cmd, shell=True, check=True, stdout=subprocess.PIPE, text=True)
-                output = result.stdout.strip()
+                # Absolute pane line (history + cursor) where the previous send left off
+                start_line = info.get('repl_line')
+                # Read what runs in the pane (a shell may have started python), and the position if unknown,
+                # before the keys land
+                replies = self._tmux_batch([
+                    ["display-message", "-p", "-t", session, "#{pane_current_command}"],
+                    self._position_cmd(session),
+                ])
+                position = self._parse_position(replies[1])
+                is_shell = bool(_SHELL_RE.match(replies[0]))
+                # Marker of an earlier send that timed out before the shell echoed it
+                pending = info.pop('repl_marker', None) if is_shell else None
+                if pending is not None:
+                    # Without an anchor, look for it on the visible screen
+                    since = start_line if start_line is not None else position[0]
+                    if self._has_marker(self._tmux_cmd(self._capture_cmd(session, since, position)), pending):
+                        pending = None
+                if start_line is None:
+                    start_line = position[1]
+                marker = None
+                text = command
+                if pending is not None:
+                    # The shell is still running that command (e.g. a read builtin waiting for input): type the
+                    # keys as they are and take the echo of the earlier marker as the sign it is done
+                    marker = pending
+                # Commands starting another REPL would never reach the marker echo, so they use the prompt heuristic
+                elif is_shell and not _REPL_RE.match(command):
+                    # The shell echoes the marker once the command is done; the quotes keep the typed line from matching.
+                    # Grouping puts the echo in the same compound command, so the shell has parsed it before the
+                    # command runs and a program reading stdin can never consume it as input
+                    nonce = uuid.uuid4().hex[:12]
+                    marker = f"__END_{nonce}__"
+                    text = f'{{ {command}\n}}; echo "__END_""{nonce}__"'
+                self._tmux_batch(self._send_keys_cmds(session, text))
+                # Wait for the REPL to print its next prompt; captures only the new lines
+                position, output = self._wait_for_prompt(session, start_line, marker)
+                if info.get('repl_marker') and self._has_marker(output, info['repl_marker']):
+                    # A timed-out command finished during this (non-shell) send
+                    del info['repl_marker']
+                if marker is not None:
+                    if not self._has_marker(output, marker) and pending is None:
+                        # Still running at READY_TIMEOUT; the next send checks whether it has finished
+                        info['repl_marker'] = marker
+                output = self._strip_marker(output, marker)
+                output = output.strip()
                 if not output:
                     output = "(No output)"
-                # Show only diff: keep previous RESPONSE and output only the diff
-                prev_output = info.get('last_repl_output', '')
-                if prev_output and output != prev_output:
-                    # Extract diff (only new part)
-                    prev_lines = prev_output.splitlines()
-                    curr_lines = output.splitlines()
-                    # Find start position of diff
-                    diff_start = 0
-                    for i in range(min(len(prev_lines), len(curr_lines))):
-                        if prev_lines[i] != curr_lines[i]:
-                            break
-                        diff_start = i + 1
-                    diff_lines = curr_lines[diff_start:]
-                    diff_str = '\n'.join(diff_lines).strip()
-                    if not diff_str:
-                        diff_str = "(No output)"
-                    self.log(f"{diff_str}", process_name=name, log_type="RESPONSE")
-                else:
-                    # On first run or if all lines match, output all
-                    self.log(f"{output}", process_name=name, log_type="RESPONSE")
-                # Save current output
-                info['last_repl_output'] = output
-                self.save_processes()
+                self.log(f"{output}", process_name=name, log_type="RESPONSE")
+                # Once the history is full, the next capture falls back to the visible screen (see _capture_cmd)
+                info['repl_line'] = position[1]
+                self._mark_dirty()
                 return True
             else:
-                # Non-REPL: use existing temp file method
-                tmpfile = f"/tmp/cli_commander_{name}_output.txt"
-                safe_command = command.strip()
-                wrapped_cmd = f"({safe_command}) > {tmpfile} 2>&1"
-                send_cmd = f"tmux send-keys -t {session} \"{wrapped_cmd}\" Enter"
-                subprocess.run(send_cmd, shell=True, check=True)
-                time.sleep(0.2)
-                output = ""
-                if os.path.exists(tmpfile):
-                    with open(tmpfile, 'r', encoding='utf-8', errors='replace') as f:
-                        output = f.read().strip()
-                    os.remove(tmpfile)
-                self.log(f"{output}", process_name=name, log_type="RESPONSE")
+                # Non-REPL: redirect output into a FIFO; EOF marks command completion
+                fifo = self._output_fifo()
+                # Open the read end first (non-blocking) so the shell's redirect never waits for a reader
+                fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+                eof = True
+                try:
+                    safe_command = command.strip()
+                    # If this process exits mid-command, the first cat dies of SIGPIPE and the second
+                    # keeps draining, so the command itself is never killed by a missing reader
+                    wrapped_cmd = f"({safe_command}) 2>&1 | {{ cat; cat > /dev/null; }} > {shlex.quote(fifo)}"
+                    self._tmux_batch(self._send_keys_cmds(session, wrapped_cmd))
+                    output, eof = self._read_until_eof(fd)
+                finally:
+                    if eof:
+                        os.close(fd)
+                    else:
+                        # Still running: keep a reader attached and give the next send a fresh FIFO
+                        self._fifo = None
+                        self._drain_fifo(fd, fifo)
+                self.log(f"{output.strip()}", process_name=name, log_type="RESPONSE")
+                if not eof:
+                    self.log(f"Command still running after {self.READY_TIMEOUT}s; further output is discarded",
+                             process_name=name)
                 return True
         except Exception as e:
             self.log(f"tmux send error: {e}", log_type="ERROR")
             return False
 
-    def execute_command(self, action: str, name: Optional[str] = None, command: Optional[str] = None, wait_time: float = 0.2) -> bool:
+    def _pool_sessions(self) -> List[str]:
+        """Idle pooled sessions, listed from the tmux server each time since other commanders share the pool."""
+        try:
+            names = self._tmux_cmd(["list-sessions", "-F", "#{session_name}"]).splitlines()
+        except RuntimeError:
+            names = []
+        return [n for n in names if n.startswith(self.POOL_PREFIX)]
+
+    def _acquire_session(self, session: str, work_dir: str, command: str) -> Optional[int]:
+        """Take an idle pooled session, rename it to session and respawn its pane with command.
+
+        Returns the new pane PID, or None when the pool is empty. Raises RuntimeError
+        ('duplicate session') if session already exists.
+        """
+        pool = self._pool_sessions()
+        while pool:
+            pooled = pool.pop()
+            # Rename on its own: on failure nothing must be respawned
+            try:
+                self._tmux_cmd(["rename-session", "-t", pooled, session])
+            except RuntimeError as e:
+                if "duplicate session" in str(e):
+                    raise
+                # Pooled session is gone (e.g. taken by another commander)
+                continue
+            result = self._tmux_batch([
+                ["respawn-pane", "-k", "-t", session, "-c", work_dir, command],
+                ["clear-history", "-t", session],
+                ["display-message", "-p", "-t", session, "#{pane_pid}"],
+            ])[-1]
+            return int(result.strip())
+        return None
+
+    def _release_session(self, session: str) -> bool:
+        """Park session in the pool with an idle pane instead of killing it. False if the pool is full."""
+        while True:
+            pool = self._pool_sessions()
+            if len(pool) >= self.POOL_SIZE:
+                return False
+            index = 0
+            while f"{self.POOL_PREFIX}{index}" in pool:
+                index += 1
+            pooled = f"{self.POOL_PREFIX}{index}"
+            try:
+                self._tmux_cmd(["rename-session", "-t", session, pooled])
+                break
+            except RuntimeError as e:
+                # Another commander parked a session under this name meanwhile; list the pool again
+                if "duplicate session" not in str(e):
+                    raise
+        self._tmux_batch([
+            ["respawn-pane", "-k", "-t", pooled, "cat"],
+            ["clear-history", "-t", pooled],
+        ])
+        return True
+
+    def close_process(self, name: Optional[str], running_pids: Optional[Set[int]] = None, pool: bool = True) -> bool:
+        """Close a process. running_pids, if given, is a PID snapshot that spares probing PIDs not in it.
+
+        With pool=False the tmux session is always killed instead of being parked in the pool.
+        """
+        if not name or name not in self.processes:
+            self.log(f"Process '{name}' not found", log_type="ERROR")
+            return False
+        info = self.processes[name]
+        session = info.get('tmux_session')
+        pid = info.get('pid')
+        # Park tmux session in the pool, or kill it if the pool is full
+        if session:
+            try:
+                released = pool and self._release_session(session)
+            except RuntimeError:
+                released = False
+            if not released:
+                try:
+                    # '=' asks for an exact name, so a vanished session never prefix-matches another one
+                    self._tmux_cmd(["kill-session", "-t", f"={session}"])
+                except RuntimeError:
+                    # Session already gone
+                    pass
+        # Kill process if it survived its session. The snapshot predates the kill/respawn above,
+        # so it only rules PIDs out; the rest are probed now, before any signal is sent
+        if running_pids is not None and pid not in running_pids:
+            running = False
+        else:
+            running = self.process_manager.is_process_running(pid)
+        if pid and running:
+            self.process_manager.terminate_process(pid)
+        self.log(f"Closed process: {name}")
+        del self.processes[name]
+        self._mark_dirty()
+        return True
+
+    def execute_command(self, action: str, name: Optional[str] = None, command: Optional[str] = None, wait_time: float = 0.2,
+                        expect_output: bool = True) -> bool:
         """Unified command executor for all actions."""
         if action == "send":
             # Only sleep after sending command, handled inside send_to_process
-            return self.send_to_process(name, command)
+            return self.send_to_process(name, command, expect_output)
 
         if action == "new":
             if name in self.processes:
@@ -205,7 +760,7 @@ class CLI_Commander:
                 return True
             # Start bash when creating a new process
             self.processes[name] = {'pid': None, 'command': None, 'start_time': None}
-            self.save_processes()
+            self._mark_dirty()
             self.log(f"Created new process entry: {name}")
             # Start bash as run
             return self.execute_command("run", name, "bash", wait_time)
@@ -217,57 +772,57 @@ class CLI_Commander:
             safe_command = command.strip()
             self.log(f"{safe_command}", process_name=name, log_type="COMMAND")
             session = f"cli_{name}"
-            # Check if tmux session exists
-            check_cmd = f"tmux has-session -t {session}"
-            session_exists = subprocess.run(check_cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
             try:
-                if not session_exists:
-                    # Create new session
-                    tmux_cmd = f"tmux new-session -d -s {session} '{safe_command}'"
-                    subprocess.run(tmux_cmd, shell=True, check=True)
-                    get_pid_cmd = f"tmux list-panes -t {session} -F '#{{pane_pid}}'"
-                    result = subprocess.run(get_pid_cmd, shell=True, check=True, stdout=subprocess.PIPE, text=True)
-                    pid = int(result.stdout.strip().splitlines()[0])
-                    start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    self.processes[name].update({
-                        'pid': pid,
-                        'command': safe_command,
-                        'start_time': start_time,
-                        'tmux_session': session
-                    })
-                    self.save_processes()
-                    self.log(f"tmux session started (PID: {pid}, session: {session})", process_name=name, log_type="RESPONSE")
-                    return True
-                else:
-                    # Send command to existing session (sleep handled in send_to_process)
-                    return self.send_to_process(name, command)
+                # Start in the directory of the process file (the caller's cwd, also under the daemon)
+                work_dir = os.path.dirname(os.path.abspath(self.process_file))
+                try:
+                    # Reuse an idle pooled session when there is one
+                    pid = self._acquire_session(session, work_dir, safe_command)
+                    if pid is None:
+                        # Create the session; -P -F prints the new pane's PID in the same round-trip
+                        result = self._tmux_cmd(
+                            ["new-session", "-d", "-P", "-F", "#{pane_pid}", "-s", session, "-c", work_dir, safe_command]
+                        )
+                        pid = int(result.strip())
+                except RuntimeError as e:
+                    if "duplicate session" not in str(e):
+                        raise
+                    # Session already exists: send command to it
+                    return self.send_to_process(name, command, expect_output)
+                start_time = self._timestamp()
+                # Pane bookkeeping of a previous pane is meaningless for the new one
+                self.processes[name].pop('repl_line', None)
+                self.processes[name].pop('repl_marker', None)
+                self.processes[name].update({
+                    'pid': pid,
+                    'command': safe_command,
+                    'start_time': start_time,
+                    'tmux_session': session
+                })
+                self._mark_dirty()
+                self.log(f"tmux session started (PID: {pid}, session: {session})", process_name=name, log_type="RESPONSE")
+                return True
             except Exception as e:
                 self.log(f"Failed to run command: {e}", log_type="ERROR")
                 return False
 
         if action == "close":
-            if not name or name not in self.processes:
-                self.log(f"Process '{name}' not found", log_type="ERROR")
-                return False
-            info = self.processes[name]
-            session = info.get('tmux_session')
-            pid = info.get('pid')
-            # Kill tmux session if exists
-            if session:
-                kill_cmd = f"tmux kill-session -t {session}"
-                subprocess.run(kill_cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            # Kill process if still running
-            if pid and self.process_manager.is_process_running(pid):
-                self.process_manager.terminate_process(pid)
-            self.log(f"Closed process: {name}")
-            del self.processes[name]
-            self.save_processes()
-            return True
+            return self.close_process(name)
 
         if action == "close_all":
-            names = list(self.processes.keys())
-            for pname in names:
-                self.execute_command("close", pname, None, 0)
+            # One /proc listing instead of an os.kill(pid, 0) probe per process
+            running = self.process_manager.running_pids()
+            for pname in list(self.processes.keys()):
+                self.close_process(pname, running, pool=False)
+            # Empty the pool too, so no idle sessions are left behind
+            pooled = self._pool_sessions()
+            if pooled:
+                try:
+                    self._tmux_batch([["kill-session", "-t", f"={p}"] for p in pooled])
+                except RuntimeError:
+                    pass
+            self.close_tmux_control()
+            self.save_processes()
             self.log("All processes closed.")
             return True
 
@@ -310,8 +865,240 @@ def run_test():
     commander.log("Unified test completed!")
 
 
-def main():
-    """Main function to parse arguments and execute unified CLI_Commander actions."""
+def _send_frame(sock: socket.socket, payload: Dict[str, Any]):
+    """Send one length-prefixed JSON frame."""
+    data = _dumps(payload)
+    sock.sendall(struct.pack("!I", len(data)) + data)
+
+
+def _recv_frame(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """Receive one length-prefixed JSON frame, or None if the peer closed the connection."""
+    def recv_exact(size: int) -> Optional[bytes]:
+        buf = b""
+        while len(buf) < size:
+            chunk = sock.recv(size - len(buf))
+            if not chunk:
+                return None
+            buf += chunk
+        return buf
+
+    header = recv_exact(4)
+    if header is None:
+        return None
+    data = recv_exact(struct.unpack("!I", header)[0])
+    if data is None:
+        return None
+    return _loads(data)
+
+
+class UnixSocketServer:
+    """Long-lived daemon keeping CLI_Commander state (registry, tmux control client) in memory."""
+
+    # Exit after this many seconds without a request
+    IDLE_TIMEOUT = 3600.0
+
+    def __init__(self, path: str = SOCKET_PATH):
+        self.path = path
+        # One commander per process file, i.e. per client working directory
+        self.commanders: Dict[str, CLI_Commander] = {}
+        self.running = True
+        self._sock: Optional[socket.socket] = None
+        # Inode of the socket file this daemon bound, so it never removes a successor's socket
+        self._sock_ino: Optional[int] = None
+
+    def _commander(self, cwd: str) -> CLI_Commander:
+        process_file = os.path.join(cwd, "unified_process_info.json")
+        commander = self.commanders.get(process_file)
+        if commander is None:
+            commander = CLI_Commander(process_file)
+            self.commanders[process_file] = commander
+        return commander
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute one CLI request and return its exit code and log output."""
+        if request.get('stop'):
+            self.running = False
+            return {'code': 0, 'output': "CLI_Commander daemon stopped\n"}
+        if request.get('version') != CODE_VERSION:
+            # The client runs different code: exit so it starts a fresh daemon
+            self.running = False
+            return {'restart': True}
+        commander = self._commander(request['cwd'])
+        out = io.StringIO()
+        commander.out = out
+        try:
+            # Pick up changes made by --no_daemon runs or another daemon
+            commander.reload_if_changed()
+            try:
+                args = build_parser().parse_args(request['argv'])
+            except SystemExit:
+                commander.log(f"Invalid arguments: {' '.join(request['argv'])}", log_type="ERROR")
+                return {'code': 2, 'output': out.getvalue()}
+            code = dispatch(commander, args)
+        except Exception as e:
+            commander.log(f"Daemon error: {e}", log_type="ERROR")
+            code = 1
+        finally:
+            # Write the registry before replying so other readers see this request's changes
+            commander.flush_processes()
+            commander.out = sys.stdout
+        return {'code': code, 'output': out.getvalue()}
+
+    def close(self):
+        """Save every registry, disconnect from tmux and give up the socket path."""
+        for commander in self.commanders.values():
+            commander.flush_processes()
+            commander.close_tmux_control()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            try:
+                if os.stat(self.path).st_ino == self._sock_ino:
+                    os.unlink(self.path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _on_sigterm(signum, frame):
+        # Unwind through serve_forever's cleanup and the atexit hooks (registry save, FIFO removal)
+        raise SystemExit(0)
+
+    def _bind(self) -> Optional[socket.socket]:
+        """Bind and listen on the socket path, or return None if another daemon already serves it."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Serialise daemons starting at the same time, so none unlinks a socket another one just bound
+        with open(self.path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Created owner-only instead of chmod-ing after the fact
+            umask = os.umask(0o177)
+            try:
+                try:
+                    sock.bind(self.path)
+                except OSError as e:
+                    if e.errno != errno.EADDRINUSE:
+                        raise
+                    try:
+                        connect_daemon(self.path, spawn=False).close()
+                        # Another daemon is already serving this socket
+                        sock.close()
+                        return None
+                    except OSError:
+                        os.unlink(self.path)
+                        sock.bind(self.path)
+                # Listen right away: connections refused after bind would make the socket look stale
+                sock.listen()
+            finally:
+                os.umask(umask)
+            self._sock_ino = os.stat(self.path).st_ino
+        return sock
+
+    def serve_forever(self):
+        sock = self._bind()
+        if sock is None:
+            return
+        self._sock = sock
+        signal.signal(signal.SIGTERM, self._on_sigterm)
+        sock.settimeout(self.IDLE_TIMEOUT)
+        try:
+            while self.running:
+                try:
+                    conn, _ = sock.accept()
+                except socket.timeout:
+                    break
+                with conn:
+                    try:
+                        request = _recv_frame(conn)
+                        if request is None:
+                            continue
+                        reply = self.handle(request)
+                        if not self.running:
+                            # Release the socket path before replying so a restarting client spawns a new daemon
+                            self.close()
+                        _send_frame(conn, reply)
+                    except OSError:
+                        pass
+        finally:
+            self.close()
+
+
+def connect_daemon(path: str = SOCKET_PATH, spawn: bool = True, timeout: float = 5.0) -> socket.socket:
+    """Connect to the daemon, starting it in the background if it is not running."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return sock
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        if not spawn:
+            raise
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--daemon"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        stdin=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    deadline = time.monotonic() + timeout
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+            return sock
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+
+
+def _request_daemon(sock: socket.socket, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Send one request and wait up to CLIENT_TIMEOUT for the reply (None, reported on stderr, if there is none)."""
+    sock.settimeout(CLIENT_TIMEOUT)
+    try:
+        _send_frame(sock, request)
+        reply = _recv_frame(sock)
+    except socket.timeout:
+        print(f"CLI_Commander daemon did not reply within {CLIENT_TIMEOUT}s", file=sys.stderr)
+        return None
+    if reply is None:
+        print("CLI_Commander daemon closed the connection", file=sys.stderr)
+    return reply
+
+
+def run_client(argv: List[str]) -> int:
+    """Forward the CLI arguments to the daemon and print its reply."""
+    request = {'argv': argv, 'cwd': os.getcwd(), 'version': CODE_VERSION}
+    with connect_daemon() as sock:
+        reply = _request_daemon(sock, request)
+    if reply is not None and reply.get('restart'):
+        # The daemon ran older code and has exited; connecting again starts the current one
+        with connect_daemon() as sock:
+            reply = _request_daemon(sock, request)
+    if reply is None:
+        return 1
+    if reply.get('restart'):
+        print("CLI_Commander daemon kept asking for a restart", file=sys.stderr)
+        return 1
+    sys.stdout.write(reply['output'])
+    return reply['code']
+
+
+def stop_daemon() -> int:
+    """Ask a running daemon to save its state and exit."""
+    try:
+        sock = connect_daemon(spawn=False)
+    except OSError:
+        print("CLI_Commander daemon is not running")
+        return 0
+    with sock:
+        reply = _request_daemon(sock, {'stop': True})
+    if reply is None:
+        return 1
+    sys.stdout.write(reply['output'])
+    return reply['code']
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="CLI_Commander - Unified Process Manager")
     parser.add_argument('--new', action='store_true', help='Create new process')
     parser.add_argument('--run', action='store_true', help='Run command in tmux session (create or send)')
@@ -322,10 +1109,15 @@ def main():
     parser.add_argument('--name', type=str, help='Process name')
     parser.add_argument('--command', type=str, help='Command to execute')
     parser.add_argument('--wait', type=float, default=0, help='Wait time in seconds')
-    
-    args = parser.parse_args()
-    commander = CLI_Commander()
-    
+    parser.add_argument('--no_output', action='store_true', help='Send without waiting for or printing the output')
+    parser.add_argument('--daemon', action='store_true', help='Run the background daemon serving CLI requests')
+    parser.add_argument('--stop', action='store_true', help='Stop the background daemon')
+    parser.add_argument('--no_daemon', action='store_true', help='Execute in this process instead of via the daemon')
+    return parser
+
+
+def dispatch(commander: CLI_Commander, args: argparse.Namespace) -> int:
+    """Execute the action selected by the parsed arguments."""
     if args.new:
         if not args.name:
             commander.log("--name required for --new", log_type="ERROR")
@@ -336,7 +1128,7 @@ def main():
         if not args.name or not args.command:
             commander.log("--name and --command required for --run", log_type="ERROR")
             return 1
-        commander.execute_command('run', args.name, args.command, args.wait)
+        commander.execute_command('run', args.name, args.command, args.wait, not args.no_output)
         return 0
     if args.close:
         if not args.name:
@@ -350,6 +1142,23 @@ def main():
     if args.list:
         commander.execute_command('list', args.name, None, args.wait)
         return 0
+    return 0
+
+
+def main():
+    """Main function to parse arguments and execute unified CLI_Commander actions."""
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.daemon:
+        UnixSocketServer().serve_forever()
+        return 0
+    if args.stop:
+        return stop_daemon()
+    if args.new or args.run or args.close or args.close_all or args.list:
+        if args.no_daemon:
+            return dispatch(CLI_Commander(), args)
+        return run_client(sys.argv[1:])
     if args.test:
         run_test()
         return 0